@@ -1,6 +1,6 @@
-from fastapi import FastAPI, APIRouter, HTTPException, Depends, UploadFile, File, Form, status
+from fastapi import FastAPI, APIRouter, HTTPException, Depends, UploadFile, File, Form, Header, Request, status
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
-from fastapi.responses import StreamingResponse
+from fastapi.responses import StreamingResponse, Response, JSONResponse
 from dotenv import load_dotenv
 from starlette.middleware.cors import CORSMiddleware
 from motor.motor_asyncio import AsyncIOMotorClient
@@ -17,6 +17,14 @@ import bcrypt
 import base64
 from io import BytesIO
 import json
+import asyncio
+import hashlib
+import math
+import time
+import re
+import ipaddress
+import secrets
+from PIL import Image, ImageOps
 
 ROOT_DIR = Path(__file__).parent
 load_dotenv(ROOT_DIR / '.env')
@@ -34,6 +42,50 @@ ACCESS_TOKEN_EXPIRE_MINUTES = 30
 
 security = HTTPBearer()
 
+# Template thumbnail atlas
+ATLAS_CELL_WIDTH = 320
+ATLAS_CELL_HEIGHT = 180  # 16:9, matches the aspect-video gallery cards
+ATLAS_COLUMNS = 8
+ATLAS_MAX_SPRITES = 64  # sprites per atlas sheet
+ATLAS_QUALITY = 85
+
+# Rebuilt only when the template fingerprint changes
+# Previous-generation sheets stay servable so clients holding the old manifest don't 404
+template_atlas_cache: Dict[str, Any] = {"fingerprint": None, "manifest": None, "images": {}, "previous_images": {}}
+template_atlas_lock = asyncio.Lock()
+
+# Admission control, per route class
+ADMISSION_LIMITS = {
+    # bcrypt hashing/verification is CPU bound
+    "auth": {"max_concurrent": 4, "max_queue": 16, "queue_timeout": 5.0, "rate_per_minute": 10, "burst": 5},
+    "upload": {"max_concurrent": 4, "max_queue": 8, "queue_timeout": 10.0, "rate_per_minute": 30, "burst": 10},
+    "write": {"max_concurrent": 16, "max_queue": 64, "queue_timeout": 10.0, "rate_per_minute": 120, "burst": 30},
+}
+MAX_RATE_BUCKETS = 10000  # idle buckets are pruned past this size
+
+# Failed logins per (username, client IP); only failures are charged
+LOGIN_FAILURE_LIMITS = {"rate_per_minute": 3, "burst": 3}
+
+# Matched before the request body is read, so rejected requests cost nothing to parse
+ADMISSION_ROUTES = [
+    ("POST", re.compile(r"^/api/auth/(login|signup)$"), "auth"),
+    ("POST", re.compile(r"^/api/upload$"), "upload"),
+    ("POST", re.compile(r"^/api/projects$"), "write"),
+    ("PUT", re.compile(r"^/api/projects/[^/]+$"), "write"),
+    ("POST", re.compile(r"^/api/projects/[^/]+/export$"), "write"),
+]
+
+# Proxies whose X-Forwarded-For entries are trusted when resolving the client IP
+TRUSTED_PROXIES = [
+    ipaddress.ip_network(network.strip())
+    for network in os.environ.get('TRUSTED_PROXIES', '').split(',') if network.strip()
+]
+OPERATOR_TOKEN = os.environ.get('OPERATOR_TOKEN')
+
+# Dashboard bootstrap projections
+PROJECT_SUMMARY_FIELDS = {"_id": 0, "id": 1, "title": 1, "width": 1, "height": 1, "created_at": 1, "updated_at": 1}
+TEMPLATE_SUMMARY_FIELDS = {"_id": 0, "id": 1, "title": 1, "category": 1, "width": 1, "height": 1, "is_premium": 1}
+
 # Create the main app without a prefix
 app = FastAPI(title="PicEditor API", version="1.0.0")
 
@@ -142,6 +194,190 @@ async def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(s
         raise HTTPException(status_code=401, detail="User not found")
     return User(**user)
 
+# Admission Control
+class TokenBucketLimiter:
+    """Per-key token buckets."""
+
+    def __init__(self, name: str, rate_per_minute: float, burst: int):
+        self.name = name
+        self.rate = rate_per_minute / 60
+        self.burst = burst
+        self.buckets: Dict[str, tuple] = {}
+        self.rejected_rate = 0
+
+    def available_tokens(self, key: str, now: float) -> float:
+        tokens, updated = self.buckets.get(key, (self.burst, now))
+        return min(self.burst, tokens + (now - updated) * self.rate)
+
+    def check_token(self, key: str) -> float:
+        """Like take_token, but leaves the bucket untouched."""
+        tokens = self.available_tokens(key, time.monotonic())
+        if tokens < 1:
+            self.rejected_rate += 1
+            return (1 - tokens) / self.rate
+        return 0.0
+
+    def take_token(self, key: str) -> float:
+        """Consume a token for key; returns 0 if admitted, else seconds until one is available."""
+        now = time.monotonic()
+        tokens = self.available_tokens(key, now)
+
+        if tokens < 1:
+            self.buckets[key] = (tokens, now)
+            self.rejected_rate += 1
+            return (1 - tokens) / self.rate
+
+        self.buckets[key] = (tokens - 1, now)
+        if len(self.buckets) > MAX_RATE_BUCKETS:
+            self.prune_buckets(now)
+        return 0.0
+
+    def prune_buckets(self, now: float):
+        # A bucket that has refilled completely carries no state worth keeping
+        self.buckets = {
+            key: (tokens, updated) for key, (tokens, updated) in self.buckets.items()
+            if tokens + (now - updated) * self.rate < self.burst
+        }
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            "rate_per_minute": self.rate * 60,
+            "burst": self.burst,
+            "tracked_clients": len(self.buckets),
+            "rejected_rate": self.rejected_rate
+        }
+
+class RouteClassLimiter(TokenBucketLimiter):
+    """Concurrency cap with a bounded wait queue plus per-client token buckets."""
+
+    def __init__(self, name: str, max_concurrent: int, max_queue: int, queue_timeout: float,
+                 rate_per_minute: float, burst: int):
+        super().__init__(name, rate_per_minute, burst)
+        self.max_concurrent = max_concurrent
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self.semaphore = asyncio.Semaphore(max_concurrent)
+        self.active = 0
+        self.waiting = 0
+        self.rejected_load = 0
+
+    async def acquire(self) -> bool:
+        """Wait for a slot in the bounded queue; returns False if the request should be shed."""
+        if self.semaphore.locked() and self.waiting >= self.max_queue:
+            self.rejected_load += 1
+            return False
+
+        self.waiting += 1
+        try:
+            await asyncio.wait_for(self.semaphore.acquire(), timeout=self.queue_timeout)
+        except asyncio.TimeoutError:
+            self.rejected_load += 1
+            return False
+        finally:
+            self.waiting -= 1
+        self.active += 1
+        return True
+
+    def release(self):
+        self.active -= 1
+        self.semaphore.release()
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            **super().snapshot(),
+            "active": self.active,
+            "max_concurrent": self.max_concurrent,
+            "waiting": self.waiting,
+            "max_queue": self.max_queue,
+            "rejected_load": self.rejected_load
+        }
+
+route_limiters = {name: RouteClassLimiter(name, **limits) for name, limits in ADMISSION_LIMITS.items()}
+login_failure_limiter = TokenBucketLimiter("login_failures", **LOGIN_FAILURE_LIMITS)
+
+def is_trusted_proxy(host: str) -> bool:
+    try:
+        address = ipaddress.ip_address(host)
+    except ValueError:
+        return False
+    return any(address in network for network in TRUSTED_PROXIES)
+
+def client_ip(request: Request) -> str:
+    # Walk X-Forwarded-For from the nearest hop, skipping trusted proxies; the first
+    # untrusted address is the client. Entries added by untrusted peers are ignored.
+    peer = request.client.host if request.client else "unknown"
+    if not is_trusted_proxy(peer):
+        return peer
+
+    forwarded = [hop.strip() for hop in request.headers.get("x-forwarded-for", "").split(",") if hop.strip()]
+    for hop in reversed(forwarded):
+        if not is_trusted_proxy(hop):
+            return hop
+    return forwarded[0] if forwarded else peer
+
+def rate_limit_key(request: Request) -> str:
+    # Key by token subject without a DB lookup; anonymous or invalid tokens fall back to client IP
+    authorization = request.headers.get("authorization", "")
+    if authorization.lower().startswith("bearer "):
+        try:
+            payload = jwt.decode(authorization[7:], SECRET_KEY, algorithms=[ALGORITHM])
+            if payload.get("sub"):
+                return f"user:{payload['sub']}"
+        except JWTError:
+            pass
+    return f"ip:{client_ip(request)}"
+
+def rate_limited_response(retry_after: float) -> JSONResponse:
+    return JSONResponse(
+        status_code=429,
+        content={"detail": "Too many requests"},
+        headers={"Retry-After": str(math.ceil(retry_after))}
+    )
+
+class AdmissionMiddleware:
+    """Applies route-class limits before the endpoint reads or parses the request body."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        route_class = next(
+            (name for method, pattern, name in ADMISSION_ROUTES
+             if scope["method"] == method and pattern.match(scope["path"])),
+            None
+        )
+        if route_class is None:
+            await self.app(scope, receive, send)
+            return
+
+        limiter = route_limiters[route_class]
+        retry_after = limiter.take_token(rate_limit_key(Request(scope)))
+        if retry_after:
+            await rate_limited_response(retry_after)(scope, receive, send)
+            return
+
+        if not await limiter.acquire():
+            response = JSONResponse(
+                status_code=503,
+                content={"detail": "Server busy, try again later"},
+                headers={"Retry-After": str(math.ceil(limiter.queue_timeout))}
+            )
+            await response(scope, receive, send)
+            return
+
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            limiter.release()
+
+async def require_operator(x_operator_token: Optional[str] = Header(None)):
+    if not OPERATOR_TOKEN or not x_operator_token or not secrets.compare_digest(x_operator_token, OPERATOR_TOKEN):
+        raise HTTPException(status_code=403, detail="Operator credentials required")
+
 # Auth Endpoints
 @api_router.post("/auth/signup", response_model=Token)
 async def signup(user_data: UserCreate):
@@ -153,7 +389,7 @@ async def signup(user_data: UserCreate):
         raise HTTPException(status_code=400, detail="Username or email already registered")
     
     # Create new user
-    hashed_password = get_password_hash(user_data.password)
+    hashed_password = await asyncio.to_thread(get_password_hash, user_data.password)
     user = User(
         username=user_data.username,
         email=user_data.email,
@@ -186,16 +422,29 @@ async def signup(user_data: UserCreate):
     )
 
 @api_router.post("/auth/login", response_model=Token)
-async def login(user_data: UserLogin):
+async def login(user_data: UserLogin, request: Request):
+    # Failed attempts are limited per (username, client IP), so guessing is throttled
+    # without letting a third party lock the account out for everyone else
+    failure_key = f"{user_data.username}|{client_ip(request)}"
+    retry_after = login_failure_limiter.check_token(failure_key)
+    if retry_after:
+        raise HTTPException(
+            status_code=429,
+            detail="Too many failed login attempts",
+            headers={"Retry-After": str(math.ceil(retry_after))}
+        )
+
     # Find user
     user_doc = await db.users.find_one({"username": user_data.username}, {"_id": 0})
     if not user_doc:
+        login_failure_limiter.take_token(failure_key)
         raise HTTPException(status_code=401, detail="Incorrect username or password")
     
     user = User(**user_doc)
     
     # Verify password
-    if not verify_password(user_data.password, user.hashed_password):
+    if not await asyncio.to_thread(verify_password, user_data.password, user.hashed_password):
+        login_failure_limiter.take_token(failure_key)
         raise HTTPException(status_code=401, detail="Incorrect username or password")
     
     # Create access token
@@ -258,6 +507,14 @@ async def get_user_projects(current_user: User = Depends(get_current_user)):
     
     return projects
 
+@api_router.get("/projects/thumbnails")
+async def get_project_thumbnails(current_user: User = Depends(get_current_user)):
+    projects = await db.projects.find(
+        {"user_id": current_user.id, "thumbnail": {"$ne": None}},
+        {"_id": 0, "id": 1, "thumbnail": 1}
+    ).to_list(1000)
+    return {project["id"]: project["thumbnail"] for project in projects}
+
 @api_router.get("/projects/{project_id}", response_model=Project)
 async def get_project(project_id: str, current_user: User = Depends(get_current_user)):
     project = await db.projects.find_one(
@@ -321,6 +578,93 @@ async def delete_project(project_id: str, current_user: User = Depends(get_curre
     
     return {"message": "Project deleted successfully"}
 
+# Template Atlas Helpers
+def decode_data_uri(data_uri: str) -> bytes:
+    if data_uri.startswith("data:") and "," in data_uri:
+        data_uri = data_uri.split(",", 1)[1]
+    return base64.b64decode(data_uri)
+
+def build_template_atlases(templates: List[Dict[str, Any]]):
+    """Pack template thumbnails into fixed-cell sprite sheets.
+
+    Returns the atlas descriptors, the per-template sprite coordinates and
+    the encoded sheets keyed by their content hash.
+    """
+    cells = []
+    for template in templates:
+        if not template.get("thumbnail"):
+            continue
+        try:
+            image = Image.open(BytesIO(decode_data_uri(template["thumbnail"])))
+            image = ImageOps.fit(image.convert("RGBA"), (ATLAS_CELL_WIDTH, ATLAS_CELL_HEIGHT))
+        except Exception:
+            logger.warning("Skipping unreadable thumbnail for template %s", template.get("id"))
+            continue
+        cells.append((template["id"], image))
+
+    atlases = []
+    sprites = {}
+    images = {}
+    for start in range(0, len(cells), ATLAS_MAX_SPRITES):
+        chunk = cells[start:start + ATLAS_MAX_SPRITES]
+        columns = min(ATLAS_COLUMNS, len(chunk))
+        rows = -(-len(chunk) // columns)
+        sheet = Image.new("RGBA", (columns * ATLAS_CELL_WIDTH, rows * ATLAS_CELL_HEIGHT), (0, 0, 0, 0))
+
+        placements = {}
+        for index, (template_id, image) in enumerate(chunk):
+            x = (index % columns) * ATLAS_CELL_WIDTH
+            y = (index // columns) * ATLAS_CELL_HEIGHT
+            sheet.paste(image, (x, y))
+            placements[template_id] = {"x": x, "y": y}
+
+        buffer = BytesIO()
+        sheet.save(buffer, format="WEBP", quality=ATLAS_QUALITY)
+        data = buffer.getvalue()
+        atlas_id = hashlib.sha256(data).hexdigest()[:20]
+
+        images[atlas_id] = data
+        atlases.append({
+            "id": atlas_id,
+            "url": f"/api/templates/atlas/{atlas_id}.webp",
+            "width": sheet.width,
+            "height": sheet.height
+        })
+        for template_id, placement in placements.items():
+            sprites[template_id] = {"atlas": atlas_id, **placement}
+
+    return atlases, sprites, images
+
+async def get_template_fingerprint() -> str:
+    # Templates are immutable once inserted, so ids and creation times identify the set
+    docs = await db.templates.find({}, {"_id": 0, "id": 1, "created_at": 1}).sort("id", 1).to_list(1000)
+    digest = hashlib.sha256()
+    for doc in docs:
+        digest.update(f"{doc.get('id')}|{doc.get('created_at')}\n".encode("utf-8"))
+    return digest.hexdigest()[:20]
+
+async def get_template_atlas_state() -> Dict[str, Any]:
+    fingerprint = await get_template_fingerprint()
+    if template_atlas_cache["fingerprint"] == fingerprint:
+        return template_atlas_cache
+
+    async with template_atlas_lock:
+        if template_atlas_cache["fingerprint"] != fingerprint:
+            templates = await db.templates.find({}, {"_id": 0, "id": 1, "thumbnail": 1}).to_list(1000)
+            atlases, sprites, images = await asyncio.to_thread(build_template_atlases, templates)
+            template_atlas_cache.update(
+                fingerprint=fingerprint,
+                manifest={
+                    "version": fingerprint,
+                    "cell": {"width": ATLAS_CELL_WIDTH, "height": ATLAS_CELL_HEIGHT},
+                    "atlases": atlases,
+                    "sprites": sprites
+                },
+                images=images,
+                previous_images=template_atlas_cache["images"]
+            )
+    return template_atlas_cache
+
 # Template Endpoints
 @api_router.get("/templates", response_model=List[Template])
 async def get_templates():
@@ -337,6 +681,90 @@ async def get_template_categories():
     categories = await db.templates.distinct("category")
     return {"categories": categories}
 
+@api_router.get("/templates/atlas")
+async def get_template_atlas(request: Request):
+    state = await get_template_atlas_state()
+    etag = f'"{state["fingerprint"]}"'
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+
+    if request.headers.get("if-none-match") == etag:
+        return Response(status_code=304, headers=headers)
+
+    return Response(
+        content=json.dumps(state["manifest"]),
+        media_type="application/json",
+        headers=headers
+    )
+
+@api_router.get("/templates/atlas/{atlas_id}.webp")
+async def get_template_atlas_image(atlas_id: str):
+    # Serve from the built generations; only build when nothing has been built yet
+    state = template_atlas_cache
+    if state["fingerprint"] is None:
+        state = await get_template_atlas_state()
+    data = state["images"].get(atlas_id) or state["previous_images"].get(atlas_id)
+
+    if data is None:
+        raise HTTPException(status_code=404, detail="Atlas not found")
+
+    return Response(
+        content=data,
+        media_type="image/webp",
+        headers={
+            "ETag": f'"{atlas_id}"',
+            "Cache-Control": "public, max-age=31536000, immutable"
+        }
+    )
+
+@api_router.get("/templates/{template_id}", response_model=Template)
+async def get_template(template_id: str):
+    template = await db.templates.find_one({"id": template_id}, {"_id": 0})
+
+    if not template:
+        raise HTTPException(status_code=404, detail="Template not found")
+
+    if isinstance(template['created_at'], str):
+        template['created_at'] = datetime.fromisoformat(template['created_at'])
+
+    return Template(**template)
+
+# Dashboard Endpoints
+def section_etag(items: Any) -> str:
+    body = json.dumps(items, sort_keys=True, default=str).encode("utf-8")
+    return f'"{hashlib.sha256(body).hexdigest()[:20]}"'
+
+@api_router.get("/dashboard/bootstrap")
+async def get_dashboard_bootstrap(
+    known: Optional[str] = None,
+    current_user: User = Depends(get_current_user)
+):
+    """Everything the dashboard needs for first paint in one round trip.
+
+    `known` is a comma-separated list of `section:etag` pairs the client
+    already holds; matching sections are returned without their items.
+    Project thumbnails are left out and served by /projects/thumbnails.
+    """
+    known_etags = {}
+    for entry in (known.split(",") if known else []):
+        name, _, etag = entry.partition(":")
+        known_etags[name] = etag
+
+    projects, templates, categories = await asyncio.gather(
+        db.projects.find({"user_id": current_user.id}, PROJECT_SUMMARY_FIELDS).to_list(1000),
+        db.templates.find({}, TEMPLATE_SUMMARY_FIELDS).to_list(1000),
+        db.templates.distinct("category")
+    )
+
+    sections = {}
+    for name, items in (("projects", projects), ("templates", templates), ("categories", categories)):
+        etag = section_etag(items)
+        if known_etags.get(name) == etag:
+            sections[name] = {"etag": etag, "not_modified": True}
+        else:
+            sections[name] = {"etag": etag, "items": items}
+
+    return sections
+
 # File Upload Endpoint
 @api_router.post("/upload")
 async def upload_file(
@@ -388,9 +816,16 @@ async def export_project(
 async def health_check():
     return {"status": "healthy", "timestamp": datetime.now(timezone.utc).isoformat()}
 
+@api_router.get("/health/limits", dependencies=[Depends(require_operator)])
+async def admission_status():
+    limiters = [*route_limiters.values(), login_failure_limiter]
+    return {limiter.name: limiter.snapshot() for limiter in limiters}
+
 # Include the router in the main app
 app.include_router(api_router)
 
+app.add_middleware(AdmissionMiddleware)
+
 app.add_middleware(
     CORSMiddleware,
     allow_credentials=True,
@@ -11,13 +11,16 @@ class PicEditorAPITester:
         self.tests_passed = 0
         self.user_id = None
         self.project_id = None
+        self.last_response = None
 
-    def run_test(self, name, method, endpoint, expected_status, data=None, files=None):
+    def run_test(self, name, method, endpoint, expected_status, data=None, files=None, extra_headers=None):
         """Run a single API test"""
         url = f"{self.base_url}/{endpoint}"
         headers = {'Content-Type': 'application/json'}
         if self.token:
             headers['Authorization'] = f'Bearer {self.token}'
+        if extra_headers:
+            headers.update(extra_headers)
 
         self.tests_run += 1
         print(f"\n🔍 Testing {name}...")
@@ -37,6 +40,7 @@ class PicEditorAPITester:
                 response = requests.put(url, json=data, headers=headers)
             elif method == 'DELETE':
                 response = requests.delete(url, headers=headers)
+            self.last_response = response
 
             success = response.status_code == expected_status
             if success:
@@ -196,6 +200,68 @@ class PicEditorAPITester:
         )
         return success
 
+    def test_template_atlas(self):
+        """Test template atlas manifest, conditional request and atlas images"""
+        success, manifest = self.run_test(
+            "Template Atlas Manifest",
+            "GET",
+            "api/templates/atlas",
+            200
+        )
+        if not success:
+            return False
+
+        etag = self.last_response.headers.get('ETag')
+        success, _ = self.run_test(
+            "Template Atlas Not Modified",
+            "GET",
+            "api/templates/atlas",
+            304,
+            extra_headers={'If-None-Match': etag}
+        )
+        if not success:
+            return False
+
+        for atlas in manifest.get('atlases', []):
+            success, _ = self.run_test(
+                "Template Atlas Image",
+                "GET",
+                atlas['url'].lstrip('/'),
+                200
+            )
+            if not success or 'immutable' not in self.last_response.headers.get('Cache-Control', ''):
+                print("❌ Atlas image is not served as immutable")
+                return False
+        return True
+
+    def test_dashboard_bootstrap(self):
+        """Test dashboard bootstrap with and without known section ETags"""
+        success, response = self.run_test(
+            "Dashboard Bootstrap",
+            "GET",
+            "api/dashboard/bootstrap",
+            200
+        )
+        if not success:
+            return False
+
+        sections = ('projects', 'templates', 'categories')
+        if any('items' not in response.get(name, {}) for name in sections):
+            print("❌ Bootstrap is missing section items")
+            return False
+
+        known = ','.join(f"{name}:{response[name]['etag']}" for name in sections)
+        success, cached = self.run_test(
+            "Dashboard Bootstrap With Known ETags",
+            "GET",
+            f"api/dashboard/bootstrap?known={requests.utils.quote(known)}",
+            200
+        )
+        if not success or not all(cached.get(name, {}).get('not_modified') for name in sections):
+            print("❌ Known sections were not reported as not modified")
+            return False
+        return True
+
     def test_export_project(self):
         """Test project export"""
         if not self.project_id:
@@ -211,6 +277,43 @@ class PicEditorAPITester:
         )
         return success
 
+    def login_until_limited(self, usernames):
+        """Send failed logins until one is rejected with 429; returns its detail"""
+        for username in usernames:
+            response = requests.post(
+                f"{self.base_url}/api/auth/login",
+                json={"username": username, "password": "wrong-password"}
+            )
+            if response.status_code == 429:
+                if 'Retry-After' not in response.headers:
+                    print("❌ Failed - 429 without Retry-After")
+                    return None
+                print(f"   429: {response.json().get('detail')}, Retry-After: {response.headers['Retry-After']}")
+                return response.json().get('detail')
+        return None
+
+    def test_login_rate_limit(self, attempts=10):
+        """Test that failed logins hit the per-username bucket, then the per-IP bucket"""
+        stamp = datetime.now().strftime('%H%M%S%f')
+        self.tests_run += 1
+        print(f"\n🔍 Testing Login Rate Limit...")
+
+        # Repeated failures for one username trip the (username, IP) failure bucket first
+        detail = self.login_until_limited([f"ratelimit_{stamp}"] * attempts)
+        if detail != "Too many failed login attempts":
+            print(f"❌ Failed - Expected failed-login limit, got: {detail}")
+            return False
+
+        # A different username per attempt only ever hits the per-IP admission bucket
+        detail = self.login_until_limited([f"ratelimit_{stamp}_{i}" for i in range(attempts)])
+        if detail != "Too many requests":
+            print(f"❌ Failed - Expected per-IP limit, got: {detail}")
+            return False
+
+        self.tests_passed += 1
+        print("✅ Passed - Both login limits returned 429 with Retry-After")
+        return True
+
     def test_delete_project(self):
         """Test project deletion"""
         if not self.project_id:
@@ -274,6 +377,12 @@ def main():
     if not tester.test_get_templates():
         print("❌ Get templates failed")
 
+    if not tester.test_template_atlas():
+        print("❌ Template atlas failed")
+
+    if not tester.test_dashboard_bootstrap():
+        print("❌ Dashboard bootstrap failed")
+
     # Test export
     if not tester.test_export_project():
         print("❌ Export project failed")
@@ -282,6 +391,10 @@ def main():
     if not tester.test_delete_project():
         print("❌ Delete project failed")
 
+    # Rate limiting (last, it exhausts this client's login budget)
+    if not tester.test_login_rate_limit():
+        print("❌ Login rate limit failed")
+
     # Print results
     print(f"\n📊 Test Results:")
     print(f"   Tests run: {tester.tests_run}")
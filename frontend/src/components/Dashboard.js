@@ -32,6 +32,7 @@ import { DropdownMenu, DropdownMenuContent, DropdownMenuItem, DropdownMenuTrigge
 const Dashboard = () => {
   const [projects, setProjects] = useState([]);
   const [templates, setTemplates] = useState([]);
+  const [templateAtlas, setTemplateAtlas] = useState(null);
   const [loading, setLoading] = useState(true);
   const [searchTerm, setSearchTerm] = useState('');
   const [viewMode, setViewMode] = useState('grid');
@@ -43,16 +44,32 @@ const Dashboard = () => {
 
   useEffect(() => {
     fetchData();
+    fetchTemplateAtlas();
   }, []);
 
   const fetchData = async () => {
     try {
-      const [projectsRes, templatesRes] = await Promise.all([
-        axios.get('/api/projects'),
-        axios.get('/api/templates')
-      ]);
-      setProjects(projectsRes.data);
-      setTemplates(templatesRes.data);
+      const cacheKey = `dashboard-bootstrap:${user?.id}`;
+      const cached = JSON.parse(localStorage.getItem(cacheKey) || '{}');
+      const known = Object.entries(cached).map(([name, section]) => `${name}:${section.etag}`).join(',');
+
+      const bootstrapRes = await axios.get('/api/dashboard/bootstrap', { params: known ? { known } : {} });
+
+      const sections = {};
+      Object.entries(bootstrapRes.data).forEach(([name, section]) => {
+        sections[name] = section.not_modified ? cached[name] : section;
+      });
+
+      setProjects(sections.projects.items);
+      setTemplates(sections.templates.items);
+      fetchProjectThumbnails();
+
+      try {
+        localStorage.setItem(cacheKey, JSON.stringify(sections));
+      } catch (error) {
+        // Storage full or unavailable; the next load just refetches every section
+        console.error('Error caching dashboard data:', error);
+      }
     } catch (error) {
       console.error('Error fetching data:', error);
       toast.error('Veri yüklenirken hata oluştu');
@@ -61,6 +78,29 @@ const Dashboard = () => {
     }
   };
 
+  const fetchProjectThumbnails = async () => {
+    try {
+      const response = await axios.get('/api/projects/thumbnails');
+      setProjects(current => current.map(project => ({
+        ...project,
+        thumbnail: response.data[project.id]
+      })));
+    } catch (error) {
+      // Project cards fall back to the placeholder icon
+      console.error('Error fetching project thumbnails:', error);
+    }
+  };
+
+  const fetchTemplateAtlas = async () => {
+    try {
+      const response = await axios.get('/api/templates/atlas');
+      setTemplateAtlas(response.data);
+    } catch (error) {
+      // Template cards fall back to the placeholder icon
+      console.error('Error fetching template atlas:', error);
+    }
+  };
+
   const handleCreateProject = async () => {
     if (!newProjectName.trim()) {
       toast.error('Proje adı gerekli');
@@ -100,8 +140,9 @@ const Dashboard = () => {
     }
   };
 
-  const handleUseTemplate = async (template) => {
+  const handleUseTemplate = async (templateSummary) => {
     try {
+      const { data: template } = await axios.get(`/api/templates/${templateSummary.id}`);
       const response = await axios.post('/api/projects', {
         title: `${template.title} - Kopya`,
         canvas_data: template.canvas_data,
@@ -117,6 +158,24 @@ const Dashboard = () => {
     }
   };
 
+  const getTemplateSpriteStyle = (templateId) => {
+    const sprite = templateAtlas?.sprites[templateId];
+    if (!sprite) {
+      return null;
+    }
+
+    const atlas = templateAtlas.atlases.find(a => a.id === sprite.atlas);
+    const { width, height } = templateAtlas.cell;
+    const spanX = atlas.width - width;
+    const spanY = atlas.height - height;
+
+    return {
+      backgroundImage: `url(${axios.defaults.baseURL || ''}${atlas.url})`,
+      backgroundSize: `${(atlas.width / width) * 100}% ${(atlas.height / height) * 100}%`,
+      backgroundPosition: `${spanX ? (sprite.x / spanX) * 100 : 0}% ${spanY ? (sprite.y / spanY) * 100 : 0}%`
+    };
+  };
+
   const formatDate = (dateString) => {
     return new Date(dateString).toLocaleDateString('tr-TR', {
       year: 'numeric',
@@ -481,8 +540,8 @@ const Dashboard = () => {
                   {filteredTemplates.map((template) => (
                     <Card key={template.id} className="group hover:shadow-lg transition-all duration-200 cursor-pointer project-card">
                       <div className="aspect-video bg-gradient-to-br from-slate-100 to-slate-200 rounded-t-lg flex items-center justify-center relative overflow-hidden">
-                        {template.thumbnail ? (
-                          <img src={template.thumbnail} alt={template.title} className="w-full h-full object-cover" />
+                        {getTemplateSpriteStyle(template.id) ? (
+                          <div role="img" aria-label={template.title} className="w-full h-full bg-no-repeat" style={getTemplateSpriteStyle(template.id)} />
                         ) : (
                           <Image className="h-12 w-12 text-slate-400" />
                         )}
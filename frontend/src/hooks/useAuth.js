@@ -101,6 +101,9 @@ export const AuthProvider = ({ children }) => {
 
   const logout = () => {
     localStorage.removeItem('token');
+    Object.keys(localStorage)
+      .filter(key => key.startsWith('dashboard-bootstrap:'))
+      .forEach(key => localStorage.removeItem(key));
     setToken(null);
     setUser(null);
   };